@@ -0,0 +1,48 @@
+"""
+Shared fixtures: a vector store backed by a stub encoder instead of the MiniLM model
+"""
+
+import zlib
+
+import numpy as np
+import pytest
+
+from vector_store import VectorStore
+
+
+class StubEncoder:
+    """Deterministic bag-of-words encoder exposing the SentenceTransformer methods VectorStore uses"""
+    
+    dimension = 64
+    
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+    
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+
+@pytest.fixture
+def stub_encoder(monkeypatch):
+    def initialize_stub(self):
+        self.embedding_model = StubEncoder()
+    monkeypatch.setattr(VectorStore, "_initialize_embedding_model", initialize_stub)
+
+
+@pytest.fixture
+def store(stub_encoder, tmp_path, monkeypatch):
+    monkeypatch.delenv("CHROMA_HOST", raising=False)
+    return VectorStore(persist_directory=str(tmp_path / "chroma_db"))
+
+
+CHUNKS = [
+    "the monthly payment is due on the first day",
+    "late fees apply after fifteen days",
+    "the borrower may prepay without penalty",
+]
@@ -0,0 +1,85 @@
+"""
+Tests for the streamed /add_document_chunks_msgpack endpoint
+"""
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+import vector_service
+from conftest import CHUNKS
+
+HEADER = {"document_id": "doc1", "document_name": "Mortgage"}
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(vector_service, "vector_store", store)
+    # Used without a context manager so the startup hook does not load the real model
+    return TestClient(vector_service.app)
+
+
+def pack(*items):
+    return b"".join(msgpack.packb(item) for item in items)
+
+
+def test_msgpack_upload_adds_chunks(client):
+    response = client.post(
+        "/add_document_chunks_msgpack",
+        content=pack(HEADER, *CHUNKS),
+        headers={"content-type": "application/msgpack"}
+    )
+    
+    assert response.status_code == 200
+    assert response.json()["chunk_count"] == len(CHUNKS)
+
+
+def test_json_upload_adds_chunks(client):
+    response = client.post("/add_document_chunks_msgpack", json={**HEADER, "chunks": CHUNKS})
+    
+    assert response.status_code == 200
+    assert response.json()["chunk_count"] == len(CHUNKS)
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (pack(HEADER, "ok", 5), "application/msgpack"),
+    (pack(HEADER, *["ok"] * vector_service.STREAM_ENCODE_BATCH_SIZE, 5), "application/msgpack"),
+    (pack({"document_id": "doc1"}, "ok"), "application/msgpack"),
+    (pack("not a header"), "application/msgpack"),
+    (pack(HEADER, *CHUNKS)[:-3], "application/msgpack"),
+    (pack(HEADER, *CHUNKS) + b"\xc1", "application/msgpack"),
+    (b"", "application/msgpack"),
+    (b"", "application/json"),
+    (b"{not json", "application/json"),
+], ids=[
+    "non_str_chunk",
+    "non_str_chunk_after_full_batch",
+    "missing_document_name",
+    "non_dict_header",
+    "truncated_msgpack",
+    "malformed_msgpack",
+    "empty_msgpack",
+    "empty_json",
+    "invalid_json",
+])
+def test_invalid_upload_returns_400(client, store, body, content_type):
+    response = client.post("/add_document_chunks_msgpack", content=body, headers={"content-type": content_type})
+    
+    assert response.status_code == 400
+    assert store.get_document_info("doc1")["chunk_count"] == 0
+
+
+@pytest.mark.parametrize("env, expected", [
+    ({"WORKERS": "4"}, 1),
+    ({"WORKERS": "4", "CHROMA_HOST": "chroma", "VECTOR_BACKEND": "faiss"}, 1),
+    ({"WORKERS": "4", "CHROMA_HOST": "chroma"}, 4),
+    ({}, 1),
+], ids=["local_chromadb", "faiss", "shared_chromadb", "default"])
+def test_worker_count_requires_shared_store(monkeypatch, env, expected):
+    for name in ("WORKERS", "CHROMA_HOST", "VECTOR_BACKEND"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    
+    assert vector_service._worker_count(reload=False) == expected
+    assert vector_service._worker_count(reload=True) == 1
@@ -0,0 +1,271 @@
+"""
+Smoke tests for the vector store using a stub encoder instead of the MiniLM model
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import chromadb
+from chromadb.config import Settings
+import numpy as np
+import pytest
+from sentence_transformers import SentenceTransformer, models
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+import vector_store
+from vector_store import VectorStore
+from conftest import CHUNKS, StubEncoder
+
+
+def test_add_then_search_returns_matching_chunk(store):
+    assert store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    
+    results = store.search_chunks("monthly payment due", top_k=2)
+    
+    assert results
+    assert results[0]["chunk_id"] == "doc1_chunk_0"
+    assert results[0]["similarity_score"] == pytest.approx(1 - results[0]["distance"])
+
+
+def test_search_policy_aware_filters_contract_by_document(store):
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    store.add_document_chunks("doc2", "Lease", ["rent is due monthly"])
+    store.add_document_chunks("pol1", "Policy", ["late fees must not exceed five percent"], document_type="policy")
+    
+    results = store.search_policy_aware("late fees", document_id="doc1", contract_top_k=1, policy_top_k=1)
+    
+    assert [chunk["chunk_id"] for chunk in results["contract_chunks"]] == ["doc1_chunk_1"]
+    assert [chunk["chunk_id"] for chunk in results["policy_chunks"]] == ["pol1_chunk_0"]
+
+
+def test_semantic_cache_hits_near_duplicates_and_can_be_disabled():
+    cache = vector_store.SemanticQueryCache(max_entries=4, similarity_threshold=0.95)
+    query = StubEncoder().encode(["late fees"])[0]
+    cache.insert(query, ("contract", None, 5), [{"chunk_id": "doc1_chunk_1"}], cache.generation)
+    
+    assert cache.lookup(query, ("contract", None, 5)) == [{"chunk_id": "doc1_chunk_1"}]
+    assert cache.lookup(query, ("policy", None, 5)) is None
+    
+    cache.enabled = False
+    assert cache.lookup(query, ("contract", None, 5)) is None
+
+
+def test_semantic_cache_numpy_fallback_keeps_float32(monkeypatch):
+    monkeypatch.setattr(vector_store, "simsimd", None)
+    cache = vector_store.SemanticQueryCache(max_entries=4)
+    queries = StubEncoder().encode(["late fees", "monthly payment due"])
+    cache.insert(queries[0], ("contract", None, 5), [{"chunk_id": "doc1_chunk_1"}], cache.generation)
+    
+    assert cache._vectors.dtype == np.float32
+    assert cache.lookup(queries[0], ("contract", None, 5)) == [{"chunk_id": "doc1_chunk_1"}]
+    assert cache.lookup(queries[1], ("contract", None, 5)) is None
+
+
+@pytest.mark.skipif(vector_store.simsimd is None, reason="simsimd is not installed")
+def test_semantic_cache_simsimd_scans_int8_vectors():
+    cache = vector_store.SemanticQueryCache(max_entries=4)
+    queries = StubEncoder().encode(["late fees", "monthly payment due"])
+    for query in queries:
+        cache.insert(query, ("contract", None, 5), [{"text": str(query[:2])}], cache.generation)
+    
+    assert cache._vectors.dtype == np.int8
+    assert cache._similarities(queries[0]) == pytest.approx(queries @ queries[0], abs=0.02)
+    assert cache.lookup(queries[1], ("contract", None, 5)) == [{"text": str(queries[1][:2])}]
+
+
+def test_delete_during_search_does_not_cache_stale_results(store):
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    collection = store.contract_collection
+    
+    class DeleteDuringQuery:
+        """Collection proxy that deletes doc1 after the query has read its results"""
+        
+        def __getattr__(self, name):
+            return getattr(collection, name)
+        
+        def query(self, **kwargs):
+            results = collection.query(**kwargs)
+            store._delete_document_chunks("doc1")
+            return results
+    
+    store.contract_collection = DeleteDuringQuery()
+    assert store.search_chunks("monthly payment due", top_k=2)
+    store.contract_collection = collection
+    
+    assert store.search_chunks("monthly payment due", top_k=2) == []
+
+
+def test_reingest_with_fewer_chunks_and_delete(store):
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS[:1])
+    
+    assert store.get_document_info("doc1")["chunk_count"] == 1
+    
+    assert store._delete_document_chunks("doc1")
+    assert store.get_document_info("doc1")["chunk_count"] == 0
+    assert store.search_chunks("monthly payment") == []
+
+
+def test_concurrent_reingests_leave_no_untracked_chunks(store):
+    versions = [CHUNKS * 4, CHUNKS[:1], CHUNKS * 2, CHUNKS[:2]] * 5
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(executor.map(lambda chunks: store.add_document_chunks("doc1", "Mortgage", chunks), versions))
+    
+    assert store.contract_collection.count() == store.get_document_info("doc1")["chunk_count"]
+    
+    store._delete_document_chunks("doc1")
+    assert store.contract_collection.count() == 0
+
+
+class RacingClient:
+    """ChromaDB client wrapper where another worker always creates a collection just before we do"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.lost_races = 0
+    
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+    
+    def create_collection(self, name, metadata):
+        self.client.create_collection(name=name, metadata=metadata)
+        self.lost_races += 1
+        raise ValueError(f"Collection {name} already exists")
+
+
+def test_shared_store_survives_create_race_and_remote_reset(stub_encoder, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_HOST", "chroma")
+    local_client = chromadb.PersistentClient(path=str(tmp_path / "chroma_db"),
+                                             settings=Settings(anonymized_telemetry=False, allow_reset=True))
+    monkeypatch.setattr(vector_store.chromadb, "HttpClient", lambda **kwargs: RacingClient(local_client))
+    
+    store = VectorStore()
+    assert store.client.lost_races == 2
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    
+    # Another worker's clear_all resets the server under this worker's collection handles
+    local_client.reset()
+    
+    assert store.add_document_chunks("doc2", "Lease", ["rent is due monthly"])
+    assert store.get_document_info("doc1")["chunk_count"] == 0
+    assert store.search_chunks("rent is due monthly", top_k=1)[0]["chunk_id"] == "doc2_chunk_0"
+
+
+@pytest.mark.skipif(vector_store.faiss is None, reason="faiss is not installed")
+def test_faiss_add_then_filtered_search(stub_encoder, tmp_path):
+    store = vector_store.FAISSVectorStore(persist_directory=str(tmp_path / "faiss_db"))
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    store.add_document_chunks("doc2", "Lease", ["late rent fees apply"])
+    
+    results = store.search_chunks("late fees", document_id="doc1", top_k=1)
+    
+    assert [chunk["chunk_id"] for chunk in results] == ["doc1_chunk_1"]
+
+
+@pytest.mark.skipif(vector_store.faiss is None, reason="faiss is not installed")
+def test_faiss_reingest_delete_and_reload(stub_encoder, tmp_path):
+    persist_directory = str(tmp_path / "faiss_db")
+    store = vector_store.FAISSVectorStore(persist_directory=persist_directory)
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS)
+    store.add_document_chunks("doc1", "Mortgage", CHUNKS[:2])
+    store.add_document_chunks("doc2", "Lease", ["rent is due monthly"])
+    store._delete_document_chunks("doc2")
+    assert store.persist()
+    
+    reloaded = vector_store.FAISSVectorStore(persist_directory=persist_directory)
+    
+    assert reloaded.get_document_info("doc1")["chunk_count"] == 2
+    assert reloaded.get_document_info("doc2")["chunk_count"] == 0
+    assert reloaded.search_chunks("late fees", document_id="doc1", top_k=1)[0]["chunk_id"] == "doc1_chunk_1"
+
+
+def test_existing_l2_collection_keeps_its_space(stub_encoder, tmp_path, monkeypatch):
+    monkeypatch.delenv("CHROMA_HOST", raising=False)
+    persist_directory = str(tmp_path / "chroma_db")
+    encoder = StubEncoder()
+    settings = Settings(anonymized_telemetry=False, allow_reset=True)
+    legacy = chromadb.PersistentClient(path=persist_directory, settings=settings).create_collection("uploaded_contracts")
+    legacy.add(ids=["doc1_chunk_0"], embeddings=encoder.encode(CHUNKS[:1]).tolist(),
+               documents=CHUNKS[:1], metadatas=[{"document_id": "doc1", "document_name": "Mortgage"}])
+    
+    store = VectorStore(persist_directory=persist_directory)
+    results = store.search_chunks("the monthly payment", top_k=1)
+    
+    assert (store.contract_collection.metadata or {}).get("hnsw:space", "l2") == "l2"
+    expected = float(encoder.encode(["the monthly payment"])[0] @ encoder.encode(CHUNKS[:1])[0])
+    assert results[0]["similarity_score"] == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.fixture
+def tiny_sentence_transformer(tmp_path):
+    """Randomly initialized one-layer BERT wrapped like all-MiniLM-L6-v2, built without downloads"""
+    words = sorted({word for chunk in CHUNKS for word in chunk.split()})
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *words]))
+    model_dir = str(tmp_path / "tiny_bert")
+    BertTokenizerFast(vocab_file=str(vocab_file)).save_pretrained(model_dir)
+    BertModel(BertConfig(vocab_size=len(words) + 5, hidden_size=16, num_hidden_layers=1,
+                         num_attention_heads=2, intermediate_size=32)).save_pretrained(model_dir)
+    
+    transformer = models.Transformer(model_dir, max_seq_length=256)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension())
+    return SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu")
+
+
+def test_encode_queries_truncates_to_query_max_seq_length(store, tiny_sentence_transformer):
+    store.embedding_model = tiny_sentence_transformer
+    short_query = CHUNKS[0]
+    long_query = " ".join(CHUNKS * 20)
+    
+    assert store.encode_queries([short_query]) == pytest.approx(store.encode_batch([short_query]), abs=1e-5)
+    
+    tiny_sentence_transformer.max_seq_length = vector_store.QUERY_MAX_SEQ_LENGTH
+    expected = store.encode_batch([long_query])
+    tiny_sentence_transformer.max_seq_length = 256
+    
+    assert store.encode_queries([long_query]) == pytest.approx(expected, abs=1e-5)
+    assert store.encode_batch([long_query]) != pytest.approx(expected, abs=1e-5)
+
+
+class StubTokenizer:
+    """Tokenizes by whitespace into word-length IDs, padding to the longest text like a HF tokenizer"""
+    
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        self.max_length = max_length
+        ids = [[len(word) for word in text.split()][:max_length] for text in texts]
+        width = max(len(row) for row in ids)
+        return {
+            "input_ids": np.array([row + [0] * (width - len(row)) for row in ids], dtype=np.int64),
+            "attention_mask": np.array([[1] * len(row) + [0] * (width - len(row)) for row in ids], dtype=np.int64),
+        }
+
+
+class StubORTModel:
+    """Returns [token_id, 1, 0] per real token and a large constant vector for padding"""
+    
+    config = SimpleNamespace(hidden_size=3)
+    
+    def __call__(self, input_ids, attention_mask):
+        hidden = np.stack([input_ids, np.ones_like(input_ids), np.zeros_like(input_ids)], axis=-1).astype(np.float32)
+        hidden[attention_mask == 0] = [100.0, 100.0, 100.0]
+        return SimpleNamespace(last_hidden_state=hidden)
+
+
+def test_onnx_encoder_mean_pools_real_tokens_and_normalizes():
+    encoder = vector_store.ONNXEmbeddingModel.__new__(vector_store.ONNXEmbeddingModel)
+    encoder.tokenizer = StubTokenizer()
+    encoder.model = StubORTModel()
+    encoder.max_seq_length = 256
+    
+    embeddings = encoder.encode(["aa b", "aaaa bb cccccc"])
+    
+    expected = np.array([[1.5, 1, 0], [4, 1, 0]], dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    assert embeddings.dtype == np.float32
+    assert embeddings == pytest.approx(expected)
+    assert encoder.tokenizer.max_length == 256
+    
+    encoder.encode(["aa b"], max_seq_length=vector_store.QUERY_MAX_SEQ_LENGTH)
+    assert encoder.tokenizer.max_length == vector_store.QUERY_MAX_SEQ_LENGTH
+    
+    assert encoder.encode([]).shape == (0, 3)
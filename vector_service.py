@@ -4,12 +4,19 @@ Vector Service - FastAPI microservice for vector store operations
 Integrates with the Local Document Agent backend
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Optional
 import uvicorn
+import asyncio
 import logging
+import msgpack
+import numpy as np
+import orjson
+import os
+from concurrent.futures import ThreadPoolExecutor
 from vector_store import get_vector_store, VectorStore
 
 # Configure logging
@@ -20,7 +27,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Vector Store Service",
     description="Semantic search service for Local Document Agent",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -69,6 +77,9 @@ class DocumentInfoResponse(BaseModel):
     chunk_count: int
     document_type: Optional[str] = None
 
+# Number of streamed chunks handed to the encoder at a time
+STREAM_ENCODE_BATCH_SIZE = 64
+
 # Initialize vector store
 vector_store: VectorStore = None
 
@@ -77,12 +88,22 @@ async def startup_event():
     """Initialize vector store on startup"""
     global vector_store
     try:
+        # Blocking vector store calls run on the default executor via asyncio.to_thread
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="vector-service")
+        )
         vector_store = get_vector_store()
         logger.info("✅ Vector store service started successfully")
     except Exception as e:
         logger.error(f"❌ Failed to initialize vector store: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush the vector store to disk on shutdown"""
+    if vector_store is not None:
+        await asyncio.to_thread(vector_store.persist)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -104,7 +125,8 @@ async def add_document_chunks(request: DocumentChunksRequest):
         Success status and chunk count
     """
     try:
-        success = vector_store.add_document_chunks(
+        success = await asyncio.to_thread(
+            vector_store.add_document_chunks,
             document_id=request.document_id,
             document_name=request.document_name,
             chunks=request.chunks,
@@ -116,7 +138,9 @@ async def add_document_chunks(request: DocumentChunksRequest):
         
         if success:
             # Get document info to return chunk count
-            doc_info = vector_store.get_document_info(request.document_id)
+            doc_info = await asyncio.to_thread(
+                vector_store.get_document_info, request.document_id, request.document_type
+            )
             return {
                 "success": True,
                 "message": f"Added {len(request.chunks)} chunks for document: {request.document_name}",
@@ -129,7 +153,128 @@ async def add_document_chunks(request: DocumentChunksRequest):
         logger.error(f"Error adding document chunks: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/search_chunks")
+async def _cancel_tasks(tasks: List[asyncio.Task]):
+    """Cancel outstanding tasks and wait for them so their exceptions are retrieved"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+@app.post("/add_document_chunks_msgpack")
+async def add_document_chunks_msgpack(request: Request):
+    """
+    Add document chunks from a streamed request body, encoding them while the upload is still arriving
+    
+    An application/msgpack body is a stream of msgpack objects: a header map with the
+    DocumentChunksRequest fields except chunks, followed by one string per chunk. Any other
+    content type is read as a JSON DocumentChunksRequest body.
+    
+    Args:
+        request: Raw request carrying the document info and chunks
+        
+    Returns:
+        Success status and chunk count
+    """
+    chunks: List[str] = []
+    pending: List[str] = []
+    encode_tasks = []
+    
+    def validate_header(item) -> DocumentChunksRequest:
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=400, detail="Request body must start with a document header")
+        fields = {key: value for key, value in item.items() if key != "chunks"}
+        try:
+            return DocumentChunksRequest(**fields, chunks=[])
+        except (ValidationError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    def queue_chunk(chunk):
+        if not isinstance(chunk, str):
+            raise HTTPException(status_code=400, detail=f"Chunk {len(chunks)} is not a string")
+        chunks.append(chunk)
+        pending.append(chunk)
+        if len(pending) >= STREAM_ENCODE_BATCH_SIZE:
+            flush_pending()
+    
+    def flush_pending():
+        nonlocal pending
+        if pending:
+            encode_tasks.append(asyncio.create_task(asyncio.to_thread(vector_store.encode_batch, pending)))
+            pending = []
+    
+    try:
+        header = None
+        
+        if "msgpack" in request.headers.get("content-type", ""):
+            unpacker = msgpack.Unpacker(raw=False)
+            bytes_fed = 0
+            async for data in request.stream():
+                unpacker.feed(data)
+                bytes_fed += len(data)
+                try:
+                    items = list(unpacker)
+                except msgpack.UnpackException as e:
+                    raise HTTPException(status_code=400, detail=f"Malformed msgpack body: {e}")
+                for item in items:
+                    if header is None:
+                        header = validate_header(item)
+                    else:
+                        queue_chunk(item)
+            
+            # Bytes left in the buffer are the start of an object the client never finished sending
+            if unpacker.tell() != bytes_fed:
+                raise HTTPException(status_code=400, detail="Truncated msgpack body")
+        else:
+            try:
+                payload = orjson.loads(await request.body())
+            except orjson.JSONDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+            header = validate_header(payload)
+            payload_chunks = payload.get("chunks", [])
+            if not isinstance(payload_chunks, list):
+                raise HTTPException(status_code=400, detail="chunks must be a list of strings")
+            for chunk in payload_chunks:
+                queue_chunk(chunk)
+        
+        if header is None:
+            raise HTTPException(status_code=400, detail="Request body must start with a document header")
+        flush_pending()
+        
+        batches = await asyncio.gather(*encode_tasks)
+        embeddings = np.vstack(batches) if batches else None
+        
+        success = await asyncio.to_thread(
+            vector_store.add_document_chunks,
+            document_id=header.document_id,
+            document_name=header.document_name,
+            chunks=chunks,
+            document_type=header.document_type,
+            clause_type=header.clause_type,
+            risk_level=header.risk_level,
+            policy_id=header.policy_id,
+            embeddings=embeddings
+        )
+        
+        if success:
+            doc_info = await asyncio.to_thread(
+                vector_store.get_document_info, header.document_id, header.document_type
+            )
+            return ORJSONResponse({
+                "success": True,
+                "message": f"Added {len(chunks)} chunks for document: {header.document_name}",
+                "chunk_count": doc_info["chunk_count"]
+            })
+        else:
+            raise HTTPException(status_code=500, detail="Failed to add document chunks")
+    
+    except HTTPException:
+        await _cancel_tasks(encode_tasks)
+        raise
+    except Exception as e:
+        await _cancel_tasks(encode_tasks)
+        logger.error(f"Error adding streamed document chunks: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search_chunks", response_model=SearchResponse)
 async def search_chunks(request: SearchRequest):
     """
     Search for relevant chunks using semantic similarity
@@ -141,23 +286,26 @@ async def search_chunks(request: SearchRequest):
         SearchResponse with relevant chunks and metadata
     """
     try:
-        chunks = vector_store.search_chunks(
+        # Run the blocking search in a worker thread so the event loop stays free
+        chunks = await asyncio.to_thread(
+            vector_store.search_chunks,
             query=request.query,
             document_id=request.document_id,
             top_k=request.top_k
         )
         
-        return SearchResponse(
-            chunks=chunks,
-            total_found=len(chunks),
-            query=request.query
-        )
+        # Return the payload directly to skip response model validation
+        return ORJSONResponse({
+            "chunks": chunks,
+            "total_found": len(chunks),
+            "query": request.query
+        })
         
     except Exception as e:
         logger.error(f"Error searching chunks: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/search_policy_aware")
+@app.post("/search_policy_aware", response_model=PolicyAwareSearchResponse)
 async def search_policy_aware(request: PolicyAwareSearchRequest):
     """
     Search both contract and policy collections for policy-aware analysis
@@ -169,41 +317,44 @@ async def search_policy_aware(request: PolicyAwareSearchRequest):
         PolicyAwareSearchResponse with contract and policy chunks
     """
     try:
-        results = vector_store.search_policy_aware(
+        results = await asyncio.to_thread(
+            vector_store.search_policy_aware,
             query=request.query,
             document_id=request.document_id,
             contract_top_k=request.contract_top_k,
             policy_top_k=request.policy_top_k
         )
         
-        return PolicyAwareSearchResponse(
-            contract_chunks=results["contract_chunks"],
-            policy_chunks=results["policy_chunks"],
-            query=request.query
-        )
+        return ORJSONResponse({
+            "contract_chunks": results["contract_chunks"],
+            "policy_chunks": results["policy_chunks"],
+            "query": request.query
+        })
         
     except Exception as e:
         logger.error(f"Error searching policy-aware: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/document_info/{document_id}")
-async def get_document_info(document_id: str):
+@app.get("/document_info/{document_id}", response_model=DocumentInfoResponse)
+async def get_document_info(document_id: str, document_type: Optional[str] = None):
     """
     Get information about a document in the vector store
     
     Args:
         document_id: ID of the document
+        document_type: Optional type of document ("contract" or "policy")
         
     Returns:
         DocumentInfoResponse with document information
     """
     try:
-        doc_info = vector_store.get_document_info(document_id)
-        return DocumentInfoResponse(
+        doc_info = await asyncio.to_thread(vector_store.get_document_info, document_id, document_type)
+        return ORJSONResponse(DocumentInfoResponse.model_construct(
             document_id=document_id,
             document_name=doc_info["document_name"],
-            chunk_count=doc_info["chunk_count"]
-        )
+            chunk_count=doc_info["chunk_count"],
+            document_type=doc_info.get("document_type")
+        ).model_dump())
         
     except Exception as e:
         logger.error(f"Error getting document info: {e}")
@@ -218,8 +369,8 @@ async def list_documents():
         List of document information
     """
     try:
-        documents = vector_store.list_documents()
-        return {"documents": documents}
+        documents = await asyncio.to_thread(vector_store.list_documents)
+        return ORJSONResponse({"documents": documents})
         
     except Exception as e:
         logger.error(f"Error listing documents: {e}")
@@ -237,7 +388,7 @@ async def delete_document(document_id: str):
         Success status
     """
     try:
-        success = vector_store._delete_document_chunks(document_id)
+        success = await asyncio.to_thread(vector_store._delete_document_chunks, document_id)
         if success:
             return {"success": True, "message": f"Deleted chunks for document: {document_id}"}
         else:
@@ -256,7 +407,7 @@ async def clear_all():
         Success status
     """
     try:
-        success = vector_store.clear_all()
+        success = await asyncio.to_thread(vector_store.clear_all)
         if success:
             return {"success": True, "message": "Cleared all data from vector store"}
         else:
@@ -266,12 +417,38 @@ async def clear_all():
         logger.error(f"Error clearing vector store: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _worker_count(reload: bool) -> int:
+    """
+    Number of uvicorn worker processes to run, from WORKERS
+    
+    Each worker loads its own vector store, so several workers are only safe against a
+    shared ChromaDB server; a local PersistentClient or FAISS index stays single-process.
+    """
+    if reload:
+        return 1
+    
+    shared_store = bool(os.environ.get("CHROMA_HOST")) and os.environ.get("VECTOR_BACKEND", "chromadb").lower() != "faiss"
+    workers = int(os.environ.get("WORKERS", os.cpu_count() if shared_store else 1))
+    if workers > 1 and not shared_store:
+        logger.warning(
+            f"WORKERS={workers} ignored: several workers need a shared ChromaDB server "
+            f"(CHROMA_HOST set and VECTOR_BACKEND not faiss); running a single worker"
+        )
+        return 1
+    return workers
+
 if __name__ == "__main__":
+    reload = os.environ.get("RELOAD", "").lower() in ("1", "true", "yes")
+    workers = _worker_count(reload)
+    
     # Run the FastAPI server
     uvicorn.run(
         "vector_service:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=reload,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     ) 
\ No newline at end of file
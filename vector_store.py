@@ -1,33 +1,248 @@
 #!/usr/bin/env python3
 """
 Vector Store Module for Local Document Agent
-Uses ChromaDB for persistent vector storage and semantic search
+Uses ChromaDB (or optionally FAISS) for persistent vector storage and semantic search
 """
 
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
 import numpy as np
+import torch
 import json
 import os
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 import logging
 
+# Optional SIMD similarity kernels; numpy BLAS is used when unavailable
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# Optional FAISS backend, selected with VECTOR_BACKEND=faiss
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Optional ONNX Runtime encoder, selected with EMBEDDING_BACKEND=onnx
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+except ImportError:
+    ORTModelForFeatureExtraction = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Token limit for search queries; chunks keep the model's 256-token limit
+QUERY_MAX_SEQ_LENGTH = 128
+
+class ONNXEmbeddingModel:
+    """
+    MiniLM encoder running on ONNX Runtime, exported and optionally quantized with
+    optimum-cli. Exposes the subset of the SentenceTransformer API used by VectorStore.
+    """
+    
+    def __init__(self, model_dir: str, max_seq_length: int = 256):
+        """
+        Load an exported ONNX model and its tokenizer
+        
+        Args:
+            model_dir: Directory produced by `optimum-cli export onnx` (and optionally quantize)
+            max_seq_length: Maximum number of tokens per input
+        """
+        if ORTModelForFeatureExtraction is None:
+            raise ImportError("optimum[onnxruntime] is not installed; install it to use EMBEDDING_BACKEND=onnx")
+        
+        # Prefer the int8 quantized graph when optimum-cli quantize has been run
+        file_name = "model_quantized.onnx" if os.path.exists(os.path.join(model_dir, "model_quantized.onnx")) else None
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, provider="CPUExecutionProvider", file_name=file_name
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, use_fast=True)
+        self.max_seq_length = max_seq_length
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        """Return the embedding dimension"""
+        return self.model.config.hidden_size
+    
+    def encode(self, texts: List[str], batch_size: int = 64, normalize_embeddings: bool = True,
+               max_seq_length: Optional[int] = None, **kwargs) -> np.ndarray:
+        """
+        Encode texts with mean pooling over token embeddings
+        
+        Args:
+            texts: Input texts to embed
+            batch_size: Number of texts per session run
+            normalize_embeddings: Whether to L2-normalize the pooled embeddings
+            max_seq_length: Token limit for this call, defaulting to the model's limit
+            
+        Returns:
+            float32 matrix with one embedding per input text
+        """
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=max_seq_length or self.max_seq_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.model(**inputs).last_hidden_state
+            
+            # Mean pooling over non-padding tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            
+            if normalize_embeddings:
+                pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            batches.append(pooled.astype(np.float32))
+        
+        if not batches:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.vstack(batches)
+
+class SemanticQueryCache:
+    """
+    Fixed-size ring buffer of recent query embeddings and their search results.
+    A lookup hits when a cached query with the same scope has cosine similarity
+    at or above the threshold. Cached vectors are stored as int8 to keep the
+    scan memory-bound cost low as the cache grows.
+    """
+    
+    def __init__(self, max_entries: int = 512, similarity_threshold: float = 0.95):
+        """
+        Initialize an empty semantic cache
+        
+        Args:
+            max_entries: Maximum number of cached queries before the oldest is evicted
+            similarity_threshold: Minimum cosine similarity for a cache hit
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        # int8 is only a win with SimSIMD's integer kernels; the numpy fallback keeps float32
+        # so it does not cast the whole matrix on every lookup
+        self._dtype = np.int8 if simsimd is not None else np.float32
+        self._vectors = None  # Allocated on first insert once the dimension is known
+        self._scopes = [None] * max_entries
+        self._payloads = [None] * max_entries
+        self._next = 0
+        self._size = 0
+        self._generation = 0  # Bumped by clear() so in-flight searches cannot repopulate stale results
+        self._lock = threading.Lock()
+        
+        # Disabled when other processes can change the data behind cached results
+        self.enabled = True
+    
+    @property
+    def generation(self) -> int:
+        """Counter incremented on every clear; read it before querying and pass it to insert"""
+        with self._lock:
+            return self._generation
+    
+    def lookup(self, query_embedding: np.ndarray, scope: Tuple) -> Optional[List[Dict]]:
+        """
+        Return cached results for a near-duplicate query, or None on a miss
+        
+        Args:
+            query_embedding: Normalized query vector
+            scope: Hashable tuple identifying the collection, filter and top_k
+        """
+        with self._lock:
+            if not self.enabled or self._size == 0:
+                return None
+            
+            similarities = self._similarities(query_embedding)
+            for slot in np.argsort(similarities)[::-1]:
+                if similarities[slot] < self.similarity_threshold:
+                    break
+                if self._scopes[slot] == scope:
+                    return list(self._payloads[slot])
+            return None
+    
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> np.ndarray:
+        """Scale a vector so its largest component maps to 127 and round to int8"""
+        peak = float(np.max(np.abs(vector)))
+        scale = 127.0 / peak if peak > 0 else 1.0
+        return np.clip(np.rint(vector * scale), -127, 127).astype(np.int8)
+    
+    def _similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every cached vector"""
+        cached = self._vectors[:self._size]
+        if self._dtype is np.int8:
+            # SimSIMD requires matching dtypes, so the query is quantized too
+            distances = simsimd.cdist(self._quantize(query_embedding)[None, :], cached, metric="cosine")
+            return 1 - np.asarray(distances, dtype=np.float32)[0]
+        # Vectors are normalized, so a single GEMV gives cosine similarity
+        return np.dot(cached, np.ascontiguousarray(query_embedding, dtype=np.float32))
+    
+    def insert(self, query_embedding: np.ndarray, scope: Tuple, payload: List[Dict], generation: int):
+        """
+        Store a query and its results, overwriting the oldest entry when full
+        
+        Args:
+            query_embedding: Normalized query vector
+            scope: Hashable tuple identifying the collection, filter and top_k
+            payload: Search results to cache
+            generation: Value of `generation` read before the search ran; the entry
+                is dropped if the cache was cleared in the meantime
+        """
+        with self._lock:
+            if not self.enabled or generation != self._generation:
+                return
+            
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, query_embedding.shape[0]), dtype=self._dtype)
+            
+            slot = self._next
+            if self._dtype is np.int8:
+                self._vectors[slot] = self._quantize(query_embedding)
+            else:
+                self._vectors[slot] = query_embedding
+            self._scopes[slot] = scope
+            self._payloads[slot] = list(payload)
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._generation += 1
+            self._scopes = [None] * self.max_entries
+            self._payloads = [None] * self.max_entries
+            self._next = 0
+            self._size = 0
+
 class VectorStore:
     """
     ChromaDB-based vector store for semantic document search
     """
     
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    # ChromaDB collection name and description for each collection type
+    CHROMA_COLLECTIONS = {
+        "contract": ("uploaded_contracts", "Contract document chunks with embeddings for semantic search"),
+        "policy": ("contract_policy", "Company policy chunks with embeddings for compliance checking"),
+    }
+    
+    def __init__(self, persist_directory: str = "./chroma_db", query_cache_size: int = 1024,
+                 cache_similarity_threshold: float = 0.95, semantic_cache_size: int = 512):
         """
         Initialize the vector store with ChromaDB
         
         Args:
             persist_directory: Directory to persist ChromaDB data
+            query_cache_size: Maximum number of query embeddings kept in the LRU cache
+            cache_similarity_threshold: Cosine similarity at which a cached search result is reused
+            semantic_cache_size: Maximum number of search results kept in the semantic cache
         """
         self.persist_directory = persist_directory
         self.embedding_model = None
@@ -35,17 +250,58 @@ class VectorStore:
         self.contract_collection = None
         self.policy_collection = None
         
+        # True when other service workers share the same ChromaDB server
+        self._shared_store = False
+        
+        # LRU cache of query embeddings keyed by the SHA-256 of the query text
+        self._query_cache = OrderedDict()
+        self._query_cache_size = query_cache_size
+        self._query_cache_lock = threading.Lock()
+        
+        # Semantic cache of search results for near-duplicate queries
+        self._result_cache = SemanticQueryCache(semantic_cache_size, cache_similarity_threshold)
+        
+        # Worker pool for running independent collection queries concurrently
+        self._search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vector-search")
+        
+        # Chunk IDs per document for each collection type; None when another process may write
+        self._doc_id_to_chunk_ids: Optional[Dict[str, Dict[str, List[str]]]] = None
+        self._doc_index_lock = threading.Lock()
+        
+        # Serializes document writes so the collection and the document index stay in sync
+        self._write_lock = threading.RLock()
+        
+        # Distance space of each ChromaDB collection, used to convert distances to similarity
+        self._collection_spaces: Dict[str, str] = {}
+        
         # Initialize embedding model
         self._initialize_embedding_model()
         
-        # Initialize ChromaDB
+        # Initialize the storage backend
+        self._initialize_storage()
+    
+    def _initialize_storage(self):
+        """Initialize the backend that stores chunks and embeddings"""
         self._initialize_chromadb()
     
     def _initialize_embedding_model(self):
         """Initialize the sentence transformer model for embeddings"""
         try:
-            logger.info("Loading sentence transformer model: all-MiniLM-L6-v2")
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            if os.environ.get("EMBEDDING_BACKEND", "torch").lower() == "onnx":
+                model_dir = os.environ.get("ONNX_MODEL_DIR", "minilm_onnx")
+                logger.info(f"Loading ONNX Runtime embedding model from: {model_dir}")
+                self.embedding_model = ONNXEmbeddingModel(model_dir)
+                logger.info("✅ Embedding model loaded successfully")
+                return
+            
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Loading sentence transformer model: all-MiniLM-L6-v2 on {device}")
+            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+            
+            # Run the transformer in FP16 on GPU; outputs are cast back to float32 in encode_batch
+            if device == "cuda":
+                self.embedding_model[0].auto_model.half()
+            
             logger.info("✅ Embedding model loaded successfully")
         except Exception as e:
             logger.error(f"❌ Failed to load embedding model: {e}")
@@ -54,32 +310,44 @@ class VectorStore:
     def _initialize_chromadb(self):
         """Initialize ChromaDB client and collections"""
         try:
-            # Create persist directory if it doesn't exist
-            os.makedirs(self.persist_directory, exist_ok=True)
+            settings = Settings(
+                anonymized_telemetry=False,  # Disable telemetry for local use
+                allow_reset=True
+            )
             
-            # Initialize ChromaDB client with persistent settings
-            self.client = chromadb.PersistentClient(
-                path=self.persist_directory,
-                settings=Settings(
-                    anonymized_telemetry=False,  # Disable telemetry for local use
-                    allow_reset=True
+            chroma_host = os.environ.get("CHROMA_HOST")
+            if chroma_host:
+                # Shared ChromaDB server, safe to use from several service workers
+                self.client = chromadb.HttpClient(
+                    host=chroma_host,
+                    port=int(os.environ.get("CHROMA_PORT", "8001")),
+                    settings=settings
+                )
+            else:
+                # Create persist directory if it doesn't exist
+                os.makedirs(self.persist_directory, exist_ok=True)
+                
+                # Initialize ChromaDB client with persistent settings
+                self.client = chromadb.PersistentClient(
+                    path=self.persist_directory,
+                    settings=settings
                 )
-            )
             
-            # Get or create the contract collection
-            self.contract_collection = self.client.get_or_create_collection(
-                name="uploaded_contracts",
-                metadata={"description": "Contract document chunks with embeddings for semantic search"}
-            )
+            # Get or create the contract and policy collections
+            self.contract_collection = self._get_or_create_collection("contract")
+            self.policy_collection = self._get_or_create_collection("policy")
             
-            # Get or create the policy collection
-            self.policy_collection = self.client.get_or_create_collection(
-                name="contract_policy",
-                metadata={"description": "Company policy chunks with embeddings for compliance checking"}
-            )
+            # A local client is only written by this process, so search results and collection
+            # handles can be kept; with a shared server another worker may change or reset the data
+            self._shared_store = bool(chroma_host)
+            self._result_cache.enabled = not chroma_host
+            if chroma_host:
+                self._doc_id_to_chunk_ids = None
+            else:
+                self._build_document_index()
             
             logger.info("✅ ChromaDB initialized successfully with dual collections")
-            logger.info(f"📁 Persist directory: {self.persist_directory}")
+            logger.info(f"📁 Persist directory: {chroma_host or self.persist_directory}")
             logger.info("📋 Contract collection: uploaded_contracts")
             logger.info("📋 Policy collection: contract_policy")
             
@@ -87,7 +355,98 @@ class VectorStore:
             logger.error(f"❌ Failed to initialize ChromaDB: {e}")
             raise
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def _get_or_create_collection(self, collection_type: str):
+        """
+        Open an existing collection as-is, or create a new one in cosine space
+        
+        ChromaDB fixes the distance space when a collection is created, and get_or_create_collection
+        would overwrite an existing collection's metadata without changing its index. Existing
+        collections are therefore opened without metadata, and their actual space is recorded so
+        distances can still be converted to cosine similarity.
+        """
+        name, description = self.CHROMA_COLLECTIONS[collection_type]
+        try:
+            collection = self.client.get_collection(name=name)
+        except Exception:
+            try:
+                collection = self.client.create_collection(
+                    name=name,
+                    metadata={"description": description, "hnsw:space": "cosine"}
+                )
+            except Exception:
+                # Another worker created it between our get and create
+                collection = self.client.get_collection(name=name)
+        
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        if space != "cosine" and self._collection_spaces.get(collection_type) != space:
+            logger.warning(
+                f"⚠️ Collection '{name}' uses '{space}' distance, not cosine; similarity scores are "
+                f"derived from it. Re-create the collection (clear_all and re-ingest) to switch to cosine."
+            )
+        self._collection_spaces[collection_type] = space
+        return collection
+    
+    def _collection(self, collection_type: str):
+        """
+        Return the ChromaDB collection for a collection type
+        
+        On a shared server another worker's clear_all resets the database and invalidates the
+        handles this process holds, so the collection is looked up again for every operation.
+        """
+        if self._shared_store:
+            return self._get_or_create_collection(collection_type)
+        return self.contract_collection if collection_type == "contract" else self.policy_collection
+    
+    def _build_document_index(self):
+        """Load the chunk IDs of every document with one metadata-only scan per collection"""
+        index = {"contract": {}, "policy": {}}
+        for collection_type, documents in index.items():
+            results = self._collection(collection_type).get(include=["metadatas"])
+            for chunk_id, metadata in zip(results['ids'], results['metadatas']):
+                documents.setdefault(metadata.get('document_id'), []).append(chunk_id)
+        
+        with self._doc_index_lock:
+            self._doc_id_to_chunk_ids = index
+    
+    def _document_chunk_ids(self, document_id: str, document_type: str = "contract") -> List[str]:
+        """
+        Return the chunk IDs stored for a document
+        
+        Args:
+            document_id: ID of the document
+            document_type: Type of document ("contract" or "policy")
+            
+        Returns:
+            List of chunk IDs, empty if the document is not stored
+        """
+        collection_type = "contract" if document_type == "contract" else "policy"
+        if self._doc_id_to_chunk_ids is None:
+            return self._collection(collection_type).get(where={"document_id": document_id}, include=[])['ids']
+        
+        with self._doc_index_lock:
+            return list(self._doc_id_to_chunk_ids[collection_type].get(document_id, []))
+    
+    def _set_document_chunk_ids(self, document_id: str, document_type: str, chunk_ids: List[str]):
+        """Record the chunk IDs of a document, removing the entry when empty"""
+        if self._doc_id_to_chunk_ids is None:
+            return
+        
+        collection_type = "contract" if document_type == "contract" else "policy"
+        with self._doc_index_lock:
+            if chunk_ids:
+                self._doc_id_to_chunk_ids[collection_type][document_id] = list(chunk_ids)
+            else:
+                self._doc_id_to_chunk_ids[collection_type].pop(document_id, None)
+    
+    def _distance_to_similarity(self, distance: float, collection_type: str) -> float:
+        """Convert a ChromaDB distance to cosine similarity for normalized embeddings"""
+        if self._collection_spaces.get(collection_type, "cosine") == "l2":
+            # Squared L2 between unit vectors is 2 - 2 * cosine
+            return 1 - distance / 2
+        # Cosine distance is 1 - cosine; inner-product distance is 1 - dot, the same for unit vectors
+        return 1 - distance
+    
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a given text
         
@@ -95,19 +454,99 @@ class VectorStore:
             text: Input text to embed
             
         Returns:
-            List of float values representing the embedding
+            float32 vector representing the embedding
         """
         try:
-            # Generate embedding using sentence transformer
-            embedding = self.embedding_model.encode(text)
-            return embedding.tolist()
+            return self.encode_queries([text])[0]
         except Exception as e:
             logger.error(f"❌ Failed to generate embedding: {e}")
             raise
     
+    def _embed_query_cached(self, text: str) -> np.ndarray:
+        """
+        Generate a query embedding, reusing a cached vector for repeated queries
+        
+        Args:
+            text: Query text to embed
+            
+        Returns:
+            float32 vector representing the embedding
+        """
+        key = hashlib.sha256(text.encode("utf-8")).digest()
+        
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                return embedding
+        
+        embedding = self.generate_embedding(text)
+        
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        
+        return embedding
+    
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts in a single batched call
+        
+        Args:
+            texts: Input texts to embed
+            batch_size: Number of texts per forward pass
+            
+        Returns:
+            float32 matrix of normalized embeddings, one row per input text
+        """
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_tensor=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        # Keep float32 for ChromaDB even when the model runs in FP16
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def encode_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for search queries, truncated to QUERY_MAX_SEQ_LENGTH tokens
+        
+        SentenceTransformer.encode always tokenizes to the model-wide max_seq_length, which
+        chunk encoding running in other threads relies on, so queries are tokenized here with
+        their own limit and run through the model directly.
+        
+        Args:
+            texts: Query texts to embed
+            
+        Returns:
+            float32 matrix of normalized embeddings, one row per query
+        """
+        if isinstance(self.embedding_model, ONNXEmbeddingModel):
+            return self.embedding_model.encode(texts, max_seq_length=QUERY_MAX_SEQ_LENGTH)
+        if not isinstance(self.embedding_model, SentenceTransformer):
+            return self.encode_batch(texts)
+        
+        features = self.embedding_model.tokenizer(
+            texts,
+            padding=True,  # Pad to the longest query in the batch, not to the limit
+            truncation=True,
+            max_length=QUERY_MAX_SEQ_LENGTH,
+            return_tensors="pt"
+        ).to(self.embedding_model.device)
+        with torch.inference_mode():
+            embeddings = self.embedding_model(dict(features))["sentence_embedding"].float()
+        embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return np.ascontiguousarray(embeddings.cpu().numpy(), dtype=np.float32)
+    
     def add_document_chunks(self, document_id: str, document_name: str, chunks: List[str], 
                           document_type: str = "contract", clause_type: str = None, 
-                          risk_level: str = None, policy_id: str = None) -> bool:
+                          risk_level: str = None, policy_id: str = None,
+                          embeddings: Optional[np.ndarray] = None) -> bool:
         """
         Add document chunks to the vector store
         
@@ -119,63 +558,53 @@ class VectorStore:
             clause_type: Type of clause (for contracts) or policy section (for policies)
             risk_level: Risk level assessment (for policies)
             policy_id: Policy identifier (for policies)
+            embeddings: Optional precomputed embeddings, one row per chunk
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Clear existing chunks for this document
-            self._delete_document_chunks(document_id, document_type)
-            
             if not chunks:
+                # Nothing to re-ingest, so just clear existing chunks for this document
+                self._delete_document_chunks(document_id, document_type)
                 logger.warning("No chunks provided for document")
                 return True
             
-            # Generate embeddings for all chunks
-            logger.info(f"Generating embeddings for {len(chunks)} chunks...")
-            embeddings = []
-            metadatas = []
-            ids = []
+            # Generate embeddings for all chunks in one batched call
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(chunks)} chunks...")
+                embeddings = self.encode_batch(chunks)
+            elif len(embeddings) != len(chunks):
+                raise ValueError(f"Got {len(embeddings)} embeddings for {len(chunks)} chunks")
+            ids, metadatas = self._build_chunk_metadata(
+                document_id, document_name, chunks, document_type, clause_type, risk_level, policy_id
+            )
             
             # Select appropriate collection
-            collection = self.contract_collection if document_type == "contract" else self.policy_collection
+            collection = self._collection(document_type)
             
-            for i, chunk in enumerate(chunks):
-                # Generate embedding
-                embedding = self.generate_embedding(chunk)
-                embeddings.append(embedding)
+            # Read, upsert, prune and record as one step so concurrent writes to the same
+            # document cannot leave chunks in the collection that the document index misses
+            with self._write_lock:
+                # Existing chunk IDs for this document, used to drop leftovers if the document shrank
+                existing_ids = self._document_chunk_ids(document_id, document_type)
                 
-                # Create metadata
-                metadata = {
-                    "document_id": document_id,
-                    "document_name": document_name,
-                    "document_type": document_type,
-                    "chunk_index": i,
-                    "chunk_length": len(chunk),
-                    "section_label": f"chunk_{i+1}"
-                }
-                
-                # Add policy-specific metadata
-                if document_type == "policy":
-                    metadata.update({
-                        "clause_type": clause_type or "general",
-                        "risk_level": risk_level or "medium",
-                        "policy_id": policy_id or document_id
-                    })
-                
-                metadatas.append(metadata)
+                # Upsert into the appropriate ChromaDB collection (numpy matrix passed through as-is).
+                # Chunk IDs are deterministic, so re-ingesting rewrites existing entries in place.
+                collection.upsert(
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids,
+                    documents=chunks
+                )
                 
-                # Create unique ID
-                chunk_id = f"{document_id}_chunk_{i}"
-                ids.append(chunk_id)
-            
-            # Add to appropriate ChromaDB collection
-            collection.add(
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids,
-                documents=chunks
-            )
+                # Remove chunks beyond the new chunk count
+                new_ids = set(ids)
+                stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in new_ids]
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+                self._set_document_chunk_ids(document_id, document_type, ids)
+            self._result_cache.clear()
             
             logger.info(f"✅ Added {len(chunks)} chunks for {document_type}: {document_name}")
             return True
@@ -184,6 +613,40 @@ class VectorStore:
             logger.error(f"❌ Failed to add document chunks: {e}")
             return False
     
+    def _build_chunk_metadata(self, document_id: str, document_name: str, chunks: List[str],
+                              document_type: str, clause_type: str = None, risk_level: str = None,
+                              policy_id: str = None) -> Tuple[List[str], List[Dict]]:
+        """
+        Build chunk IDs and metadata for a document's chunks
+        
+        Returns:
+            Tuple of (chunk IDs, chunk metadata dictionaries)
+        """
+        # Policy-specific metadata is the same for every chunk, so build it once
+        policy_extras = {}
+        if document_type == "policy":
+            policy_extras = {
+                "clause_type": clause_type or "general",
+                "risk_level": risk_level or "medium",
+                "policy_id": policy_id or document_id
+            }
+        
+        ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+        metadatas = [
+            {
+                "document_id": document_id,
+                "document_name": document_name,
+                "document_type": document_type,
+                "chunk_index": i,
+                "chunk_length": len(chunk),
+                "section_label": f"chunk_{i+1}",
+                **policy_extras
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+        
+        return ids, metadatas
+    
     def search_chunks(self, query: str, document_id: Optional[str] = None, top_k: int = 5, 
                      collection_type: str = "contract") -> List[Dict]:
         """
@@ -199,8 +662,39 @@ class VectorStore:
             List of dictionaries containing chunk data and similarity scores
         """
         try:
-            # Generate embedding for the query
-            query_embedding = self.generate_embedding(query)
+            # Generate embedding for the query (cached for repeated queries)
+            query_embedding = self._embed_query_cached(query)
+        except Exception as e:
+            logger.error(f"❌ Failed to search chunks: {e}")
+            return []
+        
+        return self._search_chunks_with_embedding(query_embedding, query, document_id, top_k, collection_type)
+    
+    def _search_chunks_with_embedding(self, query_embedding: np.ndarray, query: str,
+                                      document_id: Optional[str] = None, top_k: int = 5,
+                                      collection_type: str = "contract") -> List[Dict]:
+        """
+        Search a collection with a precomputed query embedding
+        
+        Args:
+            query_embedding: Normalized embedding of the query
+            query: Original query text, used for logging
+            document_id: Optional document ID to filter results
+            top_k: Number of top results to return
+            collection_type: Type of collection to search ("contract" or "policy")
+            
+        Returns:
+            List of dictionaries containing chunk data and similarity scores
+        """
+        try:
+            # Reuse results of a near-duplicate query against the same scope
+            cache_scope = (collection_type, document_id, top_k)
+            cached_results = self._result_cache.lookup(query_embedding, cache_scope)
+            if cached_results is not None:
+                logger.info(f"⚡ Semantic cache hit for {collection_type} query: '{query}'")
+                return cached_results
+            
+            cache_generation = self._result_cache.generation
             
             # Prepare where clause if filtering by document
             where_clause = None
@@ -208,11 +702,11 @@ class VectorStore:
                 where_clause = {"document_id": document_id}
             
             # Select appropriate collection
-            collection = self.contract_collection if collection_type == "contract" else self.policy_collection
+            collection = self._collection(collection_type)
             
             # Search in ChromaDB
             results = collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=query_embedding.reshape(1, -1),
                 n_results=top_k,
                 where=where_clause,
                 include=["metadatas", "documents", "distances"]
@@ -226,12 +720,14 @@ class VectorStore:
                         "chunk_id": results['ids'][0][i],
                         "text": results['documents'][0][i],
                         "metadata": results['metadatas'][0][i],
-                        "similarity_score": 1 - results['distances'][0][i],  # Convert distance to similarity
+                        "similarity_score": self._distance_to_similarity(results['distances'][0][i], collection_type),
                         "distance": results['distances'][0][i],
                         "collection_type": collection_type
                     }
                     formatted_results.append(result)
             
+            self._result_cache.insert(query_embedding, cache_scope, formatted_results, cache_generation)
+            
             logger.info(f"🔍 Found {len(formatted_results)} relevant {collection_type} chunks for query: '{query}'")
             return formatted_results
             
@@ -254,11 +750,18 @@ class VectorStore:
             Dictionary with contract and policy chunks
         """
         try:
-            # Search contract collection
-            contract_chunks = self.search_chunks(query, document_id, contract_top_k, "contract")
+            # Embed once and share the vector between both searches
+            query_embedding = self._embed_query_cached(query)
             
-            # Search policy collection
-            policy_chunks = self.search_chunks(query, None, policy_top_k, "policy")
+            # Search contract and policy collections concurrently
+            contract_future = self._search_executor.submit(
+                self._search_chunks_with_embedding, query_embedding, query, document_id, contract_top_k, "contract"
+            )
+            policy_future = self._search_executor.submit(
+                self._search_chunks_with_embedding, query_embedding, query, None, policy_top_k, "policy"
+            )
+            contract_chunks = contract_future.result()
+            policy_chunks = policy_future.result()
             
             return {
                 "contract_chunks": contract_chunks,
@@ -283,41 +786,58 @@ class VectorStore:
         """
         try:
             # Select appropriate collection
-            collection = self.contract_collection if document_type == "contract" else self.policy_collection
+            collection = self._collection(document_type)
             
-            # Delete chunks where document_id matches
-            collection.delete(where={"document_id": document_id})
+            # Delete the document's chunks by ID rather than scanning with a metadata filter
+            with self._write_lock:
+                chunk_ids = self._document_chunk_ids(document_id, document_type)
+                if chunk_ids:
+                    collection.delete(ids=chunk_ids)
+                self._set_document_chunk_ids(document_id, document_type, [])
+            self._result_cache.clear()
             logger.info(f"🗑️ Deleted {document_type} chunks for document: {document_id}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to delete document chunks: {e}")
             return False
     
-    def get_document_info(self, document_id: str) -> Dict:
+    def get_document_info(self, document_id: str, document_type: Optional[str] = None) -> Dict:
         """
         Get information about a document in the vector store
         
         Args:
             document_id: ID of the document
+            document_type: Optional type of document ("contract" or "policy"); both
+                collections are searched when not given
             
         Returns:
             Dictionary with document information
         """
         try:
-            results = self.collection.get(where={"document_id": document_id})
-            
-            if not results['ids']:
-                return {"chunk_count": 0, "document_name": None}
+            if document_type is None:
+                candidates = ["contract", "policy"]
+            elif document_type == "contract":
+                candidates = ["contract"]
+            else:
+                candidates = ["policy"]
             
-            # Get unique document name
-            document_names = set(metadata.get('document_name') for metadata in results['metadatas'])
-            document_name = list(document_names)[0] if document_names else None
+            for doc_type in candidates:
+                chunk_ids = self._document_chunk_ids(document_id, doc_type)
+                if not chunk_ids:
+                    continue
+                
+                # Fetch metadata of a single chunk by ID; embeddings and documents are not needed here
+                results = self._collection(doc_type).get(ids=chunk_ids[:1], include=["metadatas"])
+                document_name = results['metadatas'][0].get('document_name') if results['metadatas'] else None
+                
+                return {
+                    "chunk_count": len(chunk_ids),
+                    "document_name": document_name,
+                    "document_id": document_id,
+                    "document_type": doc_type
+                }
             
-            return {
-                "chunk_count": len(results['ids']),
-                "document_name": document_name,
-                "document_id": document_id
-            }
+            return {"chunk_count": 0, "document_name": None}
             
         except Exception as e:
             logger.error(f"❌ Failed to get document info: {e}")
@@ -338,14 +858,14 @@ class VectorStore:
             
             # List contract documents
             if document_type is None or document_type == "contract":
-                contract_results = self.contract_collection.get()
+                contract_results = self._collection("contract").get(include=["metadatas"])
                 if contract_results['ids']:
                     contract_docs = self._group_documents_by_id(contract_results, "contract")
                     documents.extend(contract_docs)
             
             # List policy documents
             if document_type is None or document_type == "policy":
-                policy_results = self.policy_collection.get()
+                policy_results = self._collection("policy").get(include=["metadatas"])
                 if policy_results['ids']:
                     policy_docs = self._group_documents_by_id(policy_results, "policy")
                     documents.extend(policy_docs)
@@ -358,24 +878,32 @@ class VectorStore:
     
     def _group_documents_by_id(self, results: Dict, doc_type: str) -> List[Dict]:
         """Helper method to group documents by ID"""
-        documents = {}
-        for i, metadata in enumerate(results['metadatas']):
-            doc_id = metadata.get('document_id')
-            if doc_id not in documents:
-                documents[doc_id] = {
-                    "document_id": doc_id,
-                    "document_name": metadata.get('document_name'),
-                    "document_type": doc_type,
-                    "chunk_count": 0
-                }
-                # Add policy-specific fields
-                if doc_type == "policy":
-                    documents[doc_id].update({
-                        "clause_type": metadata.get('clause_type', 'general'),
-                        "risk_level": metadata.get('risk_level', 'medium'),
-                        "policy_id": metadata.get('policy_id', doc_id)
-                    })
-            documents[doc_id]["chunk_count"] += 1
+        metadatas = results['metadatas']
+        counts = Counter(metadata.get('document_id') for metadata in metadatas)
+        
+        # Keep the first metadata entry seen for each document
+        first_seen = {}
+        for metadata in metadatas:
+            first_seen.setdefault(metadata.get('document_id'), metadata)
+        
+        documents = {
+            doc_id: {
+                "document_id": doc_id,
+                "document_name": metadata.get('document_name'),
+                "document_type": doc_type,
+                "chunk_count": counts[doc_id]
+            }
+            for doc_id, metadata in first_seen.items()
+        }
+        
+        # Add policy-specific fields
+        if doc_type == "policy":
+            for doc_id, metadata in first_seen.items():
+                documents[doc_id].update({
+                    "clause_type": metadata.get('clause_type', 'general'),
+                    "risk_level": metadata.get('risk_level', 'medium'),
+                    "policy_id": metadata.get('policy_id', doc_id)
+                })
         
         return list(documents.values())
     
@@ -387,25 +915,343 @@ class VectorStore:
             True if successful, False otherwise
         """
         try:
-            self.client.reset()
+            with self._write_lock:
+                self.client.reset()
+                self._result_cache.clear()
+                
+                # Reset drops the collections, so recreate them along with the document index
+                self._initialize_chromadb()
             logger.info("🗑️ Cleared all data from vector store")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to clear vector store: {e}")
             return False
+    
+    def persist(self) -> bool:
+        """
+        Flush the vector store to disk
+        
+        ChromaDB writes through on every change, so there is nothing to do here.
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        return True
+
+class FAISSVectorStore(VectorStore):
+    """
+    FAISS-based vector store exposing the same interface as VectorStore.
+    Each collection is an exact inner-product index over normalized embeddings,
+    with chunk text and metadata kept in memory alongside it.
+    """
+    
+    COLLECTION_TYPES = ("contract", "policy")
+    
+    def __init__(self, persist_directory: str = "./faiss_db", **kwargs):
+        """
+        Initialize the vector store with FAISS
+        
+        Args:
+            persist_directory: Directory to persist FAISS indexes and chunk metadata
+            **kwargs: Cache settings forwarded to VectorStore
+        """
+        if faiss is None:
+            raise ImportError("faiss is not installed; install faiss-cpu to use VECTOR_BACKEND=faiss")
+        
+        self._indexes = {}
+        self._records = {}
+        self._document_rows = {}
+        self._next_row_id = 0
+        self._index_lock = threading.RLock()
+        super().__init__(persist_directory, **kwargs)
+    
+    def _initialize_storage(self):
+        """Load FAISS indexes from disk, or create empty ones"""
+        try:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            dimension = self.embedding_model.get_sentence_embedding_dimension()
+            
+            for collection_type in self.COLLECTION_TYPES:
+                index_path, records_path = self._collection_paths(collection_type)
+                if os.path.exists(index_path) and os.path.exists(records_path):
+                    self._indexes[collection_type] = faiss.read_index(index_path)
+                    with open(records_path, "r") as f:
+                        self._records[collection_type] = {int(row_id): record for row_id, record in json.load(f).items()}
+                else:
+                    self._indexes[collection_type] = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+                    self._records[collection_type] = {}
+                
+                # Map each document to its FAISS row IDs so lookups skip a scan over all records
+                document_rows = {}
+                for row_id, record in self._records[collection_type].items():
+                    document_rows.setdefault(record["metadata"].get("document_id"), []).append(row_id)
+                self._document_rows[collection_type] = document_rows
+                
+                if self._records[collection_type]:
+                    self._next_row_id = max(self._next_row_id, max(self._records[collection_type]) + 1)
+            
+            logger.info("✅ FAISS initialized successfully with dual collections")
+            logger.info(f"📁 Persist directory: {self.persist_directory}")
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize FAISS: {e}")
+            raise
+    
+    def _collection_paths(self, collection_type: str) -> Tuple[str, str]:
+        """Return the index and metadata file paths for a collection"""
+        base = os.path.join(self.persist_directory, collection_type)
+        return f"{base}.index", f"{base}.json"
+    
+    def _document_row_ids(self, collection_type: str, document_id: str) -> List[int]:
+        """Return the FAISS row IDs holding chunks of a document"""
+        return list(self._document_rows[collection_type].get(document_id, []))
+    
+    def add_document_chunks(self, document_id: str, document_name: str, chunks: List[str], 
+                          document_type: str = "contract", clause_type: str = None, 
+                          risk_level: str = None, policy_id: str = None,
+                          embeddings: Optional[np.ndarray] = None) -> bool:
+        """
+        Add document chunks to the vector store, replacing any previous chunks of the document
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if not chunks:
+                self._delete_document_chunks(document_id, document_type)
+                logger.warning("No chunks provided for document")
+                return True
+            
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(chunks)} chunks...")
+                embeddings = self.encode_batch(chunks)
+            elif len(embeddings) != len(chunks):
+                raise ValueError(f"Got {len(embeddings)} embeddings for {len(chunks)} chunks")
+            embeddings = np.array(embeddings, dtype=np.float32)
+            faiss.normalize_L2(embeddings)
+            ids, metadatas = self._build_chunk_metadata(
+                document_id, document_name, chunks, document_type, clause_type, risk_level, policy_id
+            )
+            
+            collection_type = "contract" if document_type == "contract" else "policy"
+            with self._index_lock:
+                self._delete_document_chunks(document_id, collection_type)
+                
+                row_ids = np.arange(self._next_row_id, self._next_row_id + len(chunks), dtype=np.int64)
+                self._next_row_id += len(chunks)
+                self._indexes[collection_type].add_with_ids(embeddings, row_ids)
+                
+                records = self._records[collection_type]
+                for row_id, chunk_id, chunk, metadata in zip(row_ids.tolist(), ids, chunks, metadatas):
+                    records[row_id] = {"chunk_id": chunk_id, "text": chunk, "metadata": metadata}
+                self._document_rows[collection_type][document_id] = row_ids.tolist()
+            self._result_cache.clear()
+            
+            logger.info(f"✅ Added {len(chunks)} chunks for {document_type}: {document_name}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to add document chunks: {e}")
+            return False
+    
+    def _search_chunks_with_embedding(self, query_embedding: np.ndarray, query: str,
+                                      document_id: Optional[str] = None, top_k: int = 5,
+                                      collection_type: str = "contract") -> List[Dict]:
+        """
+        Search a FAISS index with a precomputed query embedding
+        
+        Returns:
+            List of dictionaries containing chunk data and similarity scores
+        """
+        try:
+            cache_scope = (collection_type, document_id, top_k)
+            cached_results = self._result_cache.lookup(query_embedding, cache_scope)
+            if cached_results is not None:
+                logger.info(f"⚡ Semantic cache hit for {collection_type} query: '{query}'")
+                return cached_results
+            
+            cache_generation = self._result_cache.generation
+            query_matrix = np.ascontiguousarray(query_embedding, dtype=np.float32).reshape(1, -1)
+            
+            with self._index_lock:
+                index = self._indexes[collection_type]
+                records = self._records[collection_type]
+                
+                if document_id:
+                    # IndexIDMap2 does not accept search parameters in faiss 1.7.4, so score
+                    # the document's rows directly from their reconstructed vectors
+                    document_row_ids = self._document_row_ids(collection_type, document_id)
+                    if not document_row_ids:
+                        return []
+                    vectors = np.vstack([index.reconstruct(row_id) for row_id in document_row_ids])
+                    document_scores = vectors @ query_matrix[0]
+                    order = np.argsort(-document_scores)[:top_k]
+                    scores = document_scores[order][None, :]
+                    row_ids = np.asarray(document_row_ids, dtype=np.int64)[order][None, :]
+                else:
+                    scores, row_ids = index.search(query_matrix, top_k)
+                
+                formatted_results = []
+                for score, row_id in zip(scores[0].tolist(), row_ids[0].tolist()):
+                    if row_id < 0:
+                        continue
+                    record = records[row_id]
+                    formatted_results.append({
+                        "chunk_id": record["chunk_id"],
+                        "text": record["text"],
+                        "metadata": record["metadata"],
+                        "similarity_score": score,  # Inner product of normalized vectors is cosine similarity
+                        "distance": 1 - score,
+                        "collection_type": collection_type
+                    })
+            
+            self._result_cache.insert(query_embedding, cache_scope, formatted_results, cache_generation)
+            
+            logger.info(f"🔍 Found {len(formatted_results)} relevant {collection_type} chunks for query: '{query}'")
+            return formatted_results
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to search chunks: {e}")
+            return []
+    
+    def _delete_document_chunks(self, document_id: str, document_type: str = "contract") -> bool:
+        """
+        Delete all chunks for a specific document
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            collection_type = "contract" if document_type == "contract" else "policy"
+            with self._index_lock:
+                row_ids = self._document_row_ids(collection_type, document_id)
+                if row_ids:
+                    self._indexes[collection_type].remove_ids(np.asarray(row_ids, dtype=np.int64))
+                    for row_id in row_ids:
+                        del self._records[collection_type][row_id]
+                self._document_rows[collection_type].pop(document_id, None)
+            self._result_cache.clear()
+            logger.info(f"🗑️ Deleted {document_type} chunks for document: {document_id}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to delete document chunks: {e}")
+            return False
+    
+    def get_document_info(self, document_id: str, document_type: Optional[str] = None) -> Dict:
+        """
+        Get information about a document in the vector store
+        
+        Returns:
+            Dictionary with document information
+        """
+        try:
+            candidates = self.COLLECTION_TYPES if document_type is None else (
+                ("contract",) if document_type == "contract" else ("policy",)
+            )
+            
+            with self._index_lock:
+                for collection_type in candidates:
+                    row_ids = self._document_row_ids(collection_type, document_id)
+                    if not row_ids:
+                        continue
+                    
+                    return {
+                        "chunk_count": len(row_ids),
+                        "document_name": self._records[collection_type][row_ids[0]]["metadata"].get("document_name"),
+                        "document_id": document_id,
+                        "document_type": collection_type
+                    }
+            
+            return {"chunk_count": 0, "document_name": None}
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get document info: {e}")
+            return {"chunk_count": 0, "document_name": None}
+    
+    def list_documents(self, document_type: str = None) -> List[Dict]:
+        """
+        List all documents in the vector store
+        
+        Returns:
+            List of document information dictionaries
+        """
+        try:
+            documents = []
+            
+            with self._index_lock:
+                for collection_type in self.COLLECTION_TYPES:
+                    if document_type is not None and document_type != collection_type:
+                        continue
+                    records = self._records[collection_type]
+                    if records:
+                        results = {
+                            "ids": [record["chunk_id"] for record in records.values()],
+                            "metadatas": [record["metadata"] for record in records.values()]
+                        }
+                        documents.extend(self._group_documents_by_id(results, collection_type))
+            
+            return documents
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to list documents: {e}")
+            return []
+    
+    def clear_all(self) -> bool:
+        """
+        Clear all data from the vector store
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with self._index_lock:
+                for collection_type in self.COLLECTION_TYPES:
+                    self._indexes[collection_type].reset()
+                    self._document_rows[collection_type] = {}
+                    self._records[collection_type] = {}
+            self._result_cache.clear()
+            logger.info("🗑️ Cleared all data from vector store")
+            return self.persist()
+        except Exception as e:
+            logger.error(f"❌ Failed to clear vector store: {e}")
+            return False
+    
+    def persist(self) -> bool:
+        """
+        Write FAISS indexes and chunk metadata to disk
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with self._index_lock:
+                for collection_type in self.COLLECTION_TYPES:
+                    index_path, records_path = self._collection_paths(collection_type)
+                    faiss.write_index(self._indexes[collection_type], index_path)
+                    with open(records_path, "w") as f:
+                        json.dump(self._records[collection_type], f)
+            logger.info(f"💾 Persisted FAISS indexes to {self.persist_directory}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to persist FAISS indexes: {e}")
+            return False
 
 # Global vector store instance
 vector_store = None
 
 def get_vector_store() -> VectorStore:
-    """Get or create the global vector store instance"""
+    """Get or create the global vector store instance (backend chosen by VECTOR_BACKEND)"""
     global vector_store
     if vector_store is None:
-        vector_store = VectorStore()
+        backend = os.environ.get("VECTOR_BACKEND", "chromadb").lower()
+        if backend == "faiss":
+            vector_store = FAISSVectorStore()
+        else:
+            vector_store = VectorStore()
     return vector_store
 
 if __name__ == "__main__":
     # Test the vector store
     vs = get_vector_store()
     print("✅ Vector store initialized successfully")
-    print(f"📁 ChromaDB location: {vs.persist_directory}") 
\ No newline at end of file
+    print(f"📁 Vector store location: {vs.persist_directory}") 
\ No newline at end of file
@@ -7,7 +7,7 @@ import chromadb
 from chromadb.config import Settings
 import numpy as np
 
-def view_embeddings():
+def view_embeddings(collection_name: str = "uploaded_contracts"):
     """View actual embedding vectors from ChromaDB"""
     
     try:
@@ -15,27 +15,27 @@ def view_embeddings():
         client = chromadb.PersistentClient(path="./chroma_db")
         
         # Get the collection
-        collection = client.get_collection("document_chunks")
+        collection = client.get_collection(collection_name)
         
-        # Get all embeddings
+        # Count entries without loading them, then fetch only the sample that is displayed
+        total = collection.count()
         results = collection.get(
+            limit=1,
             include=['embeddings', 'documents', 'metadatas']
         )
         
-        print(f"📊 Found {len(results['embeddings'])} embeddings")
-        print(f"📄 Found {len(results['documents'])} documents")
-        print(f"🏷️  Found {len(results['metadatas'])} metadata entries")
+        print(f"📊 Found {total} embeddings in collection '{collection_name}'")
         
-        if results['embeddings']:
+        if results['embeddings'] is not None and len(results['embeddings']) > 0:
             # Show first embedding vector
-            first_embedding = results['embeddings'][0]
-            print(f"\n🔍 First embedding vector (384 dimensions):")
-            print(f"   Shape: {len(first_embedding)}")
+            first_embedding = np.asarray(results['embeddings'][0], dtype=np.float32)
+            print(f"\n🔍 First embedding vector ({first_embedding.shape[0]} dimensions):")
+            print(f"   Shape: {first_embedding.shape}")
             print(f"   First 10 values: {first_embedding[:10]}")
             print(f"   Last 10 values: {first_embedding[-10:]}")
-            print(f"   Min value: {min(first_embedding):.6f}")
-            print(f"   Max value: {max(first_embedding):.6f}")
-            print(f"   Mean value: {np.mean(first_embedding):.6f}")
+            print(f"   Min value: {first_embedding.min():.6f}")
+            print(f"   Max value: {first_embedding.max():.6f}")
+            print(f"   Mean value: {first_embedding.mean():.6f}")
             
             # Show corresponding document text
             if results['documents']: